@@ -1,9 +1,18 @@
-import yfinance as yf
+import numpy as np
 import pandas as pd
-from tabulate import tabulate
 import argparse
+import functools
+import hashlib
+import heapq
+import io
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-import pytz
+from operator import itemgetter
+from pathlib import Path
+from types import MappingProxyType
+from zoneinfo import ZoneInfo
 
 # Define Sectors and Top 5 Constituents
 SECTORS = {
@@ -56,6 +65,12 @@ THEME_NAMES = {
 }
 
 INDICES = ["QQQ", "SPY", "DIA"]
+# Sectors compared against each index for its Engine/Brake lines
+INDEX_SECTORS = {
+    "QQQ": ("XLK", "XLC", "XLY"),
+    "DIA": ("XLI", "XLF", "XLV"),
+}
+DEFAULT_INDEX_SECTORS = ("XLK", "XLF", "XLV", "XLY", "XLI", "XLE")
 MACRO_TICKERS = ["GLD", "FXY", "UUP", "TLT"]
 MACRO_NAMES = {
     "GLD": "ゴールド (Gold)",
@@ -64,27 +79,265 @@ MACRO_NAMES = {
     "TLT": "米国債20年超 (Bonds)"
 }
 
-def fetch_data(start_str=None, end_str=None):
-    all_tickers = []
-    
-    # Standard Sectors
-    for sector, stocks in SECTORS.items():
-        all_tickers.append(sector)
-        all_tickers.extend(stocks)
-        
-    # Thematic Sectors
-    for sector, stocks in THEME_SECTORS.items():
-        all_tickers.append(sector)
-        all_tickers.extend(stocks)
-        
-    all_tickers.extend(INDICES)
-    all_tickers.extend(MACRO_TICKERS)
-    
-    all_tickers = list(set(all_tickers))
+# Display name for any ticker, merged once (standard sector names win over themes)
+DISPLAY_NAMES = {**MACRO_NAMES, **THEME_NAMES, **SECTOR_NAMES}
+# "Name (TICKER)" report headers for every configured ticker, formatted once
+TITLES = {t: f"{DISPLAY_NAMES.get(t, t)} ({t})"
+          for t in itertools.chain(INDICES, SECTORS, THEME_SECTORS, MACRO_TICKERS)}
+
+# Display (JST) and US market (New York) time zones
+JST = ZoneInfo("Asia/Tokyo")
+NY = ZoneInfo("America/New_York")
+
+# yf.download is issued in parallel chunks of tickers (see _download_chunked).
+# Each chunk fetches its tickers one by one, so enough workers to run every
+# chunk at once (~150 tickers / 20) keep the slowest chunk the only wait.
+DOWNLOAD_CHUNK_SIZE = 20
+DOWNLOAD_WORKERS = 8
+
+# Thread pool size for per-sector analysis in main(). Threads, not processes:
+# by then every ticker is analyzed and memoized, so sectors only read the
+# warm cache, which worker processes could not share without pickling data.
+SECTOR_WORKERS = 8
+
+# Price fields used downstream; Volume is dropped right after download
+PRICE_FIELDS = ['Open', 'High', 'Low', 'Close']
+
+# On-disk Parquet cache of downloaded ranges (see _download_with_cache)
+CACHE_DIR = Path(os.environ.get("MARKET_ANALYZER_CACHE_DIR", Path.home() / ".market_analyzer_cache"))
+# Runs without --start/--end use the rolling 15m snapshot (see
+# _download_period_with_cache) when --days fits inside it
+ROLLING_PERIOD = "1mo"
+ROLLING_PERIOD_DAYS = 28
+# Downloads that are still receiving bars are reused for one 15m bar
+# (override with MARKET_ANALYZER_CACHE_TTL, in seconds)
+LIVE_CACHE_TTL = timedelta(minutes=15)
+try:
+    LIVE_CACHE_TTL = timedelta(seconds=float(os.environ.get("MARKET_ANALYZER_CACHE_TTL", LIVE_CACHE_TTL.total_seconds())))
+except (ValueError, OverflowError):
+    print(f"Ignoring invalid MARKET_ANALYZER_CACHE_TTL; using {LIVE_CACHE_TTL.total_seconds():.0f}s")
+
+# Memo of analyze_ticker results, keyed by (ticker, start, end, window_filter) and bound to
+# the download frame they were computed from (see _cache_for).
+# Many holdings appear in several sectors/themes; each is analyzed once.
+_ticker_cache = {}
+_ticker_cache_data = None
+# Per-frame derived values (ticker set, valid-row mask, split frames), reset with the memo
+_frame_memo = {}
+
+def _download_chunked(tickers, **kwargs):
+    """
+    yf.download in concurrent chunks so HTTP latency overlaps across chunks,
+    then merge into one wide (ticker, field) frame.
+    No session is passed: yfinance keeps one process-wide curl_cffi session,
+    so every chunk already reuses its connections and cookie/crumb.
+    """
+    # Equal-sized chunks of at most DOWNLOAD_CHUNK_SIZE: the slowest chunk sets the wall time
+    n_chunks = -(-len(tickers) // DOWNLOAD_CHUNK_SIZE)
+    size = -(-len(tickers) // n_chunks)
+    chunks = [tickers[i:i + size] for i in range(0, len(tickers), size)]
+    # Imported here so --help and cache hits skip loading yfinance
+    import yfinance as yf
+    with ThreadPoolExecutor(max_workers=min(DOWNLOAD_WORKERS, len(chunks))) as ex:
+        frames = list(ex.map(lambda chunk: yf.download(chunk, threads=False, progress=False, **kwargs), chunks))
+    # Chunks may cover different bars: sort the union explicitly, later slicing relies on it
+    return _price_columns(pd.concat(frames, axis=1, sort=True))
+
+def _price_columns(data):
+    """Keep only OHLC columns: less memory for every later slice, mask and cache write."""
+    return data.loc[:, data.columns.get_level_values(-1).isin(PRICE_FIELDS)]
+
+def _read_cache(path):
+    try:
+        # Entries written before Volume was dropped still carry it
+        return _price_columns(pd.read_parquet(path))
+    except Exception as e:
+        print(f"Cache read failed ({path.name}): {e}")
+        return None
+
+def _write_cache(data, path):
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data.to_parquet(path)
+    except Exception as e:
+        print(f"Cache write failed ({path.name}): {e}")
+
+def _missing_tickers(data, tickers):
+    """
+    Requested tickers without a single complete OHLC bar in data. yfinance
+    reports a failed or rate-limited ticker as all-NaN columns, so a frame
+    with any of these must not be cached as final.
+    """
+    complete = data.notna().T.groupby(level=0).all().T.any()
+    return [t for t in tickers if not complete.get(t, False)]
+
+def _same_bars(cached, fresh):
+    """
+    True if fresh repeats the bars it shares with cached. auto_adjust rescales
+    the whole history after a split or dividend, so a tail downloaded later
+    may sit on a different adjustment basis than the cached head.
+    """
+    rows = cached.index.intersection(fresh.index)
+    cols = cached.columns.intersection(fresh.columns)
+    if rows.empty or len(cols) < len(cached.columns):
+        return False
+    return np.allclose(cached.loc[rows, cols].to_numpy(float), fresh.loc[rows, cols].to_numpy(float), equal_nan=True)
+
+def _cache_dir(tickers, interval):
+    """
+    CACHE_DIR subdirectory for one ticker set and interval. The key hashes
+    the sorted set, so it is stable across runs and across reorderings of
+    the sector tables.
+    """
+    key = hashlib.sha1(("|".join(sorted(tickers)) + "|" + interval).encode()).hexdigest()[:16]
+    return CACHE_DIR / key
+
+def _last_us_close(now=None):
+    """Most recent US regular-session close (16:00 NY on a weekday) at or before now."""
+    now = (now or datetime.now(NY)).astimezone(NY)
+    close = now.replace(hour=16, minute=0, second=0, microsecond=0)
+    if now < close: close -= timedelta(days=1)
+    while close.weekday() >= 5:
+        close -= timedelta(days=1)
+    return close
+
+def _next_us_open(close):
+    """First US regular-session open (9:30 NY on a weekday) after the given close."""
+    reopen = (close + timedelta(days=1)).replace(hour=9, minute=30)
+    while reopen.weekday() >= 5:
+        reopen += timedelta(days=1)
+    return reopen
+
+def _range_complete(end, now=None):
+    """
+    True if a [start, end) download ending on the YYYY-MM-DD date end holds
+    only finished sessions: end is on or before the New York date of the
+    last US close. Judged in NY time, whatever the host's time zone.
+    """
+    return end <= _last_us_close(now).date().isoformat()
+
+def _cache_fresh(path, now=None):
+    """
+    True if path can be reused instead of downloading. While the market is
+    closed, anything written after the last US close is current; during a
+    session, only files younger than LIVE_CACHE_TTL are.
+    """
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return False
+    now = (now or datetime.now(NY)).astimezone(NY)
+    close = _last_us_close(now)
+    if now < _next_us_open(close) and mtime >= close.timestamp():
+        return True
+    return mtime >= (now - LIVE_CACHE_TTL).timestamp()
+
+def _download_period_with_cache(tickers, period, interval):
+    """
+    _download_chunked for a rolling period (e.g. "1mo"), backed by
+    CACHE_DIR/<hash of tickers+interval>/period-<period>.parquet.
+    The snapshot is reused while _cache_fresh: until the next session opens
+    if it was taken after the last close, else for LIVE_CACHE_TTL.
+    """
+    path = _cache_dir(tickers, interval) / f"period-{period}.parquet"
+    if _cache_fresh(path):
+        data = _read_cache(path)
+        if data is not None:
+            print(f"Loaded cached data: {path}")
+            return data
+
+    data = _download_chunked(tickers, period=period, interval=interval, group_by='ticker', auto_adjust=True)
+    missing = _missing_tickers(data, tickers)
+    if missing:
+        print(f"Not caching {path.name}: no data for {', '.join(missing)}")
+    elif not data.empty:
+        _write_cache(data, path)
+    return data
+
+def _download_with_cache(tickers, start, end, interval):
+    """
+    _download_chunked for an explicit [start, end) date range, backed by
+    CACHE_DIR/<hash of tickers+interval>/<start>_<end>.parquet.
+    A cached range with the same start and an earlier end is extended by
+    downloading only the missing tail, from its last bar's day so the
+    overlap can be checked with _same_bars (else the whole range is
+    downloaded again); the extended entry then replaces it. Ranges that are not _range_complete
+    are still receiving bars: they are kept apart as
+    live-<start>_<end>.parquet, never extended, and reused only while
+    _cache_fresh. A complete range is only written once every ticker has
+    data, since it is then trusted for good.
+    """
+    kwargs = dict(interval=interval, group_by='ticker', auto_adjust=True)
+    cache_dir = _cache_dir(tickers, interval)
+    live = not _range_complete(end)
+    path = cache_dir / f"{'live-' if live else ''}{start}_{end}.parquet"
+
+    if (_cache_fresh(path) if live else path.exists()):
+        data = _read_cache(path)
+        if data is not None:
+            print(f"Loaded cached data: {path}")
+            return data
+
+    data = None
+    prefixes = sorted(p for p in cache_dir.glob(f"{start}_*.parquet") if p.stem.split("_")[1] < end)
+    prefix = prefixes[-1] if prefixes else None
+    cached = _read_cache(prefix) if prefix else None
+    if cached is not None and not cached.empty:
+        last = cached.index[-1]
+        if last.tzinfo is not None: last = last.tz_convert(NY)
+        print(f"Extending cached data {prefix.stem.replace('_', '->')} to {end}")
+        fresh = _download_chunked(tickers, start=last.strftime("%Y-%m-%d"), end=end, **kwargs)
+        if _same_bars(cached, fresh):
+            data = pd.concat([cached, fresh])
+            data = data[~data.index.duplicated(keep='last')].sort_index()
+        else:
+            print("Cached bars were re-adjusted since; downloading the full range")
+
+    if data is None:
+        data = _download_chunked(tickers, start=start, end=end, **kwargs)
+
+    missing = [] if live else _missing_tickers(data, tickers)
+    if missing:
+        print(f"Not caching {path.name}: no data for {', '.join(missing)}")
+    elif not data.empty:
+        if live:
+            # Only the latest live snapshot is worth keeping
+            for old in cache_dir.glob("live-*.parquet"):
+                if old != path: old.unlink(missing_ok=True)
+        _write_cache(data, path)
+        # A complete entry covers the prefix it was extended from (or re-downloaded over)
+        if not live and prefix is not None and path.exists():
+            prefix.unlink(missing_ok=True)
+    return data
+
+def select_sectors(sectors, selected=None):
+    """{sector: holdings} restricted to the selected sector ETFs (None keeps all)."""
+    if selected is None: return sectors
+    return {k: v for k, v in sectors.items() if k in selected}
+
+@functools.cache
+def unique_tickers(selected=None):
+    """
+    All sector ETFs, holdings, indices and macro tickers, de-duplicated in a
+    stable order. Built once; a tuple so callers can't mutate the shared copy.
+    selected: tuple of sector/theme ETFs to restrict to (see --sectors).
+    """
+    sectors = select_sectors(SECTORS, selected)
+    themes = select_sectors(THEME_SECTORS, selected)
+    return tuple(dict.fromkeys(itertools.chain(
+        sectors, *sectors.values(),
+        themes, *themes.values(),
+        INDICES, MACRO_TICKERS,
+    )))
+
+def fetch_data(start_str=None, end_str=None, tickers=None):
+    # Deterministic order keeps chunked requests and cache keys stable
+    all_tickers = tickers if tickers is not None else unique_tickers()
     
     # Determine interval and period based on start_date
     interval = "15m"
     use_period = False
+    start_dt = None
     
     if start_str:
         try:
@@ -102,237 +355,495 @@ def fetch_data(start_str=None, end_str=None):
     
     try:
         if use_period:
-            data = yf.download(all_tickers, period="1mo", interval="15m", group_by='ticker', auto_adjust=True, threads=True)
+            data = _download_period_with_cache(all_tickers, ROLLING_PERIOD, interval)
         else:
-            s_dt = pd.to_datetime(start_str)
+            # Reuse the start parsed for the interval check above
+            s_dt = start_dt if start_dt is not None else pd.to_datetime(start_str)
             e_dt = pd.to_datetime(end_str) + timedelta(days=1)
             
-            data = yf.download(all_tickers, start=s_dt.strftime("%Y-%m-%d"), end=e_dt.strftime("%Y-%m-%d"), interval=interval, group_by='ticker', auto_adjust=True, threads=True)
+            data = _download_with_cache(all_tickers, s_dt.strftime("%Y-%m-%d"), e_dt.strftime("%Y-%m-%d"), interval)
             
         return data
     except Exception as e:
         print(f"Error fetching data: {e}")
         return None
 
-def filter_data_by_date(df, start_date_str=None, end_date_str=None):
-    if df is None or df.empty: return df
-    filtered = df.copy()
-    is_tz_aware = filtered.index.tzinfo is not None
-    timezone = pytz.timezone("America/New_York")
+def parse_window_bound(value, tz_aware):
+    """
+    Parse a --start/--end value into a Timestamp comparable with the data's
+    index: naive values are localized to New York time for tz-aware data.
+    Timestamps pass through without re-parsing.
+    """
+    ts = value if isinstance(value, pd.Timestamp) else pd.Timestamp(value)
+    if tz_aware and ts.tzinfo is None:
+        ts = ts.tz_localize(NY)
+    return ts
+
+def window_slice(index, start_date=None, end_date=None):
+    """
+    Positional slice of a sorted index covering [start_date, end_date].
+    Unparseable bounds are ignored.
+    """
+    is_tz_aware = index.tzinfo is not None
+    lo, hi = 0, len(index)
     
-    if start_date_str:
+    if start_date:
         try:
-            start_dt = pd.to_datetime(start_date_str)
-            if is_tz_aware and start_dt.tzinfo is None:
-                start_dt = timezone.localize(start_dt)
-            filtered = filtered[filtered.index >= start_dt]
+            lo = index.searchsorted(parse_window_bound(start_date, is_tz_aware), side='left')
         except: pass
 
-    if end_date_str:
+    if end_date:
         try:
-            end_dt = pd.to_datetime(end_date_str)
-            if is_tz_aware and end_dt.tzinfo is None:
-                end_dt = timezone.localize(end_dt)
-            filtered = filtered[filtered.index <= end_dt]
+            hi = index.searchsorted(parse_window_bound(end_date, is_tz_aware), side='right')
         except: pass
-    return filtered
 
-def calculate_mdd_rf(df):
+    return slice(lo, hi)
+
+def filter_data_by_date(df, start_date=None, end_date=None):
+    """
+    Keep rows within [start_date, end_date]. Bounds may be strings or
+    Timestamps; parse them once with parse_window_bound when filtering
+    many frames.
+    """
+    if df is None or df.empty: return df
+    if not df.index.is_monotonic_increasing: df = df.sort_index()
+    # Two binary searches and a positional slice: no mask, no copy (callers never mutate)
+    return df.iloc[window_slice(df.index, start_date, end_date)]
+
+def align_ticker_frames(frames, fields=('Open', 'High', 'Low', 'Close')):
+    """
+    Align many per-ticker frames on one time axis for column-wise NumPy work.
+    frames: {ticker: DataFrame}. Returns (tickers, index, {field: 2-D array})
+    where index is the shared time axis and each array is (time x ticker)
+    with NaN where a ticker has no bar.
+    Empty frames and frames with a duplicated index are left out.
+    """
+    frames = {t: df for t, df in frames.items() if not df.empty and df.index.is_unique}
+    if not frames: return [], None, {}
+    # Sorted union of the time axes (the last-day and searchsorted logic relies
+    # on it), then each column is scattered in place: no wide concat
+    first, *rest = (df.index for df in frames.values())
+    index = first.append(rest).unique().sort_values()
+    fields = list(fields)
+    keys = index.asi8
+    block = np.full((len(fields), len(index), len(frames)), np.nan)
+    for j, df in enumerate(frames.values()):
+        # Frames are normally exactly the price columns: skip the column selection
+        values = df.to_numpy() if list(df.columns) == fields else df[fields].to_numpy()
+        # Every bar is in the sorted union: an int64 binary search gives its row
+        if df.index.dtype == index.dtype:
+            rows = keys.searchsorted(df.index.asi8)
+        else:
+            rows = index.get_indexer(df.index)
+        block[:, rows, j] = values.T
+    return list(frames), index, dict(zip(fields, block))
+
+def calculate_mdd_batch(highs, lows):
+    """
+    Calculate the raw MDD fraction for many tickers in one vectorized pass.
+    highs/lows: aligned (time x ticker) arrays from align_ticker_frames.
+    Returns one MDD fraction per column.
+    """
+    # fmax carries the high water mark across the NaN gaps of shorter tickers
+    roll_max = np.fmax.accumulate(highs, axis=0)
+    # Divide in place: one (time x ticker) temporary instead of two
+    drawdown = lows - roll_max
+    np.divide(drawdown, roll_max, out=drawdown)
+    return np.nanmin(drawdown, axis=0)
+
+def calculate_price_summary_batch(opens, highs, closes):
     """
-    Calculate Maximum Drawdown (MDD) and Recovery Factor (RF).
+    Start (first Open), High (max High) and End (last Close) for every
+    column of aligned (time x ticker) arrays, in three vectorized reductions.
+    """
+    cols = np.arange(opens.shape[1])
+    first = (~np.isnan(opens)).argmax(axis=0)
+    last = len(closes) - 1 - (~np.isnan(closes[::-1])).argmax(axis=0)
+    return opens[first, cols], np.nanmax(highs, axis=0), closes[last, cols]
+
+def calculate_prev_close_batch(frames):
+    """
+    Previous-day Close (for accurate Daily % Change) for many tickers at once.
+    frames: {ticker: (raw, filtered)}. The reference day is the filtered
+    frame's last day; the close comes from the unfiltered raw frame.
+    Returns {ticker: prev_close}, omitting tickers with no earlier day.
+    """
+    frames = {t: (raw, df) for t, (raw, df) in frames.items() if not df.empty and raw.index.is_unique}
+    if not frames: return {}
+
+    # The binary search below needs the union index sorted
+    closes = pd.concat({t: raw['Close'] for t, (raw, df) in frames.items()}, axis=1, sort=True)
+    last_days = pd.DatetimeIndex([df.index[-1] for raw, df in frames.values()]).normalize()
+    # Previous close = latest close strictly before the last day's midnight:
+    # one binary search per ticker into the forward-filled closes, no daily resample
+    rows = closes.index.searchsorted(last_days, side='left') - 1
+    values = closes.ffill().to_numpy()[rows.clip(min=0), np.arange(len(frames))]
+
+    return {t: v for t, r, v in zip(frames, rows, values) if r >= 0 and not np.isnan(v)}
+
+def _frame_summary(df):
+    """
+    (start, high, end, return %, MDD %, RF) for one non-empty frame: each
+    column is read once and run through the batch kernels as (time x 1).
+    """
+    opens, highs, lows, closes = (df[[f]].to_numpy() for f in PRICE_FIELDS)
+    starts, high, ends = calculate_price_summary_batch(opens, highs, closes)
+    # Drawdown = (Low - HighWaterMark) / HighWaterMark, e.g. -0.05 for -5%
+    mdd_pcts, rfs = calculate_rf_batch(starts, ends, calculate_mdd_batch(highs, lows))
+    ret = (ends[0] - starts[0]) / starts[0] * 100
+    return starts[0], high[0], ends[0], ret, mdd_pcts[0], rfs[0]
+
+def calculate_rf_batch(starts, ends, mdds):
+    """
+    Maximum Drawdown (MDD) and Recovery Factor (RF) for many tickers.
     MDD: Max percentage drop from peak to trough within the period.
-    RF: Net Return / |MDD|.
+    RF: Net Return / |MDD|; with no drawdown, 99.99 on a gain and 0.0 otherwise.
+    starts/ends: start/end prices, mdds: MDD fractions per ticker (see
+    calculate_price_summary_batch, calculate_mdd_batch).
+    Returns (MDD %, RF) arrays.
     """
-    if df.empty: return 0.0, 0.0
+    rets = (ends - starts) / starts
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rf = rets / np.abs(mdds)
+    rf = np.where(mdds == 0, np.where(rets > 0, 99.99, 0.0), rf)
+    return mdds * 100, rf
 
-    # Calculate High water mark
-    roll_max = df['High'].cummax()
-    # Drawdown = (Low - HighWaterMark) / HighWaterMark
-    daily_dd = (df['Low'] - roll_max) / roll_max
-    mdd = daily_dd.min() # This is a negative float, e.g. -0.05 for -5%
-    
-    # Return for the period
-    start_p = df.iloc[0]['Open']
-    end_p = df.iloc[-1]['Close']
-    ret = (end_p - start_p) / start_p # Float, e.g. 0.10 for 10%
-
-    # RF Calculation
-    rf = 0.0
-    if mdd == 0:
-        if ret > 0: rf = 99.99 # Infinite recovery (no drawdown)
-        else: rf = 0.0 # No return, no drawdown
-    else:
-        rf = ret / abs(mdd)
-        
-    return mdd * 100, rf # Return MDD as percentage (negative) and RF (ratio)
-
-def analyze_last_day_shape(df, prev_close=None):
-    if df.empty: return 0, "N/A", 0, 0, 0, 0, ""
-    last_date = df.index[-1].date()
-    # Handle duplicate indices if any, or strictly filter by date
-    last_day_df = df[df.index.date == last_date]
-    if last_day_df.empty: return 0, "N/A", 0, 0, 0, 0, ""
-        
-    open_p = last_day_df.iloc[0]['Open']
-    close_p = last_day_df.iloc[-1]['Close']
-    high_p = last_day_df['High'].max()
-    low_p = last_day_df['Low'].min()
+# Holding roles within a sector (Role column of analyze_sector stats)
+ROLE_ENGINE = "ENGINE (牽引)"
+ROLE_BRAKE = "BRAKE (重石)"
+
+# Last-day shape descriptions, indexed by score + 2 (score is -2 to +2)
+SHAPE_DESCS = ("安値引け (Weak)", "陰線 (Neg)", "保ち合い (Neut)", "陽線 (Pos)", "高値引け (Strong)")
+
+def score_last_day_shapes(close_pos, move_pct):
+    """
+    Vectorized last-day shape score (-2 to +2) for arrays of close position
+    within the day's range and % move. The first matching condition wins.
+    """
+    close_pos = np.asarray(close_pos)
+    move_pct = np.asarray(move_pct)
+    return np.select(
+        [close_pos > 0.8, close_pos < 0.2, move_pct > 0.3, move_pct < -0.3],
+        [2, -2, 1, -1],
+        default=0,
+    )
+
+def _last_day_bar(df, prev_close=None):
+    """Return the last day's (open, high, low, close, move_pct, date_str), or None."""
+    if df.empty: return None
+    last_ts = df.index[-1]
+    # Index is sorted, so the last day is a contiguous tail: binary-search its start
+    start_pos = df.index.searchsorted(last_ts.normalize(), side='left')
+    if start_pos >= len(df): return None
+
+    # Plain ndarray access: no row Series or label lookup per scalar
+    open_p = df['Open'].to_numpy()[start_pos]
+    close_p = df['Close'].to_numpy()[-1]
+    high_p = np.nanmax(df['High'].to_numpy()[start_pos:])
+    low_p = np.nanmin(df['Low'].to_numpy()[start_pos:])
     
     # Use Prev Close for % change if available, else Open (Intraday)
     base_p = prev_close if prev_close is not None else open_p
     move_pct = (close_p - base_p) / base_p * 100
     
-    range_len = high_p - low_p
-    date_str = last_date.strftime("%m/%d")
-    if range_len == 0: return 0, "Doji", move_pct, open_p, high_p, close_p, date_str
-    
-    close_pos = (close_p - low_p) / range_len
-    
-    desc = ""
-    score = 0 # -2 to +2
-    
-    if close_pos > 0.8:
-        desc = "高値引け (Strong)"
-        score = 2
-    elif close_pos < 0.2:
-        desc = "安値引け (Weak)"
-        score = -2
-    elif move_pct > 0.3:
-        desc = "陽線 (Pos)"
-        score = 1
-    elif move_pct < -0.3:
-        desc = "陰線 (Neg)"
-        score = -1
-    else:
-        desc = "保ち合い (Neut)"
-        score = 0
-        
-    return score, desc, move_pct, open_p, high_p, close_p, date_str
+    return open_p, high_p, low_p, close_p, move_pct, last_ts.strftime("%m/%d")
 
-def generate_three_scenarios(trend_return, last_score, last_move):
+def calculate_last_day_bars(tickers, index, arrays, prev_closes):
     """
-    Generate 3 distinct scenarios: Good (Bull), Avg (Base), Bad (Bear).
-    Returns: Grade, Scenarios Dict
+    _last_day_bar for every column of an aligned block (see
+    align_ticker_frames) in vectorized passes: each ticker's last day is the
+    rows from the start of its last bar's day up to that bar.
+    Returns {ticker: (open, high, low, close, move_pct, date_str)}.
     """
-    grade = "普"
-    scenarios = {
-        "Good": "",
-        "Avg": "",
-        "Bad": ""
-    }
-    
+    opens, highs, lows, closes = arrays['Open'], arrays['High'], arrays['Low'], arrays['Close']
+    n_rows, n_cols = closes.shape
+    cols = np.arange(n_cols)
+    valid = ~np.isnan(closes)
+
+    last = n_rows - 1 - valid[::-1].argmax(axis=0)
+    last_ts = index[last]
+    day_start = index.searchsorted(last_ts.normalize(), side='left')
+    in_day = (np.arange(n_rows)[:, None] >= day_start) & valid
+    first = in_day.argmax(axis=0)
+
+    open_p = opens[first, cols]
+    close_p = closes[last, cols]
+    high_p = np.nanmax(np.where(in_day, highs, np.nan), axis=0)
+    low_p = np.nanmin(np.where(in_day, lows, np.nan), axis=0)
+
+    # Use Prev Close for % change if available, else Open (Intraday)
+    base_p = np.array([prev_closes.get(t, np.nan) for t in tickers], dtype=float)
+    base_p = np.where(np.isnan(base_p), open_p, base_p)
+    move_pct = (close_p - base_p) / base_p * 100
+    dates = last_ts.strftime("%m/%d")
+
+    return {t: (open_p[i], high_p[i], low_p[i], close_p[i], move_pct[i], dates[i]) for i, t in enumerate(tickers)}
+
+def score_last_day_bars(bars):
+    """
+    Shape tuples from {ticker: _last_day_bar result}: N/A is handled directly,
+    every other bar (Doji included) is scored in one vectorized pass.
+    Returns {ticker: shape tuple}.
+    """
+    shapes = {}
+    valid = []
+    for t, bar in bars.items():
+        if bar is None:
+            shapes[t] = (0, "N/A", 0, 0, 0, 0, "")
+        else:
+            valid.append(t)
+    if not valid: return shapes
+
+    o, h, l, c, move, dates = zip(*(bars[t] for t in valid))
+    h, l, c, move = np.array(h), np.array(l), np.array(c), np.array(move)
+    rng = h - l
+    doji = rng == 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = np.where(doji, 0, score_last_day_shapes((c - l) / rng, move))
+    for i, t in enumerate(valid):
+        score = int(scores[i])
+        desc = "Doji" if doji[i] else SHAPE_DESCS[score + 2]
+        shapes[t] = (score, desc, move[i], o[i], h[i], c[i], dates[i])
+    return shapes
+
+# (trend_bucket, score_bucket) -> (Grade, Scenarios), built once at import.
+# trend_bucket: 1 = uptrend (>3%), -1 = downtrend (<-3%), 0 = range.
+# score_bucket: 1 = strong last day (score >= 1), -1 = weak (<= -1), 0 = neutral.
+# The Scenarios mappings are shared between results, so they are read-only proxies.
+_SCENARIO_TABLE = {
     # 1. Strong Uptrend (>3%)
-    if trend_return > 3.0:
-        if last_score >= 1: # Uptrend + Strong
-            grade = "良"
-            scenarios["Avg"] = "上昇トレンド継続。高値更新を試す動き。"
-            scenarios["Good"] = "勢いが加速し、帯状に上昇する (Band Walk)。"
-            scenarios["Bad"] = "利益確定売りで一時的な調整が入る。"
-        elif last_score <= -1: # Uptrend + Weak
-            grade = "普"
-            scenarios["Avg"] = "上昇一服。調整局面入りを示唆。"
-            scenarios["Good"] = "押し目を形成し、再度上昇に転じる。"
-            scenarios["Bad"] = "直近安値を割り込み、トレンドが崩れる。"
-        else: # Uptrend + Neutral
-            grade = "良"
-            scenarios["Avg"] = "上昇トレンド継続。押し目待ち。"
-            scenarios["Good"] = "もみ合いを上放れし、再加速する。"
-            scenarios["Bad"] = "調整が長引き、レンジ相場へ移行する。"
-            
+    (1, 1): ("良", {
+        "Good": "勢いが加速し、帯状に上昇する (Band Walk)。",
+        "Avg": "上昇トレンド継続。高値更新を試す動き。",
+        "Bad": "利益確定売りで一時的な調整が入る。"}),
+    (1, -1): ("普", {
+        "Good": "押し目を形成し、再度上昇に転じる。",
+        "Avg": "上昇一服。調整局面入りを示唆。",
+        "Bad": "直近安値を割り込み、トレンドが崩れる。"}),
+    (1, 0): ("良", {
+        "Good": "もみ合いを上放れし、再加速する。",
+        "Avg": "上昇トレンド継続。押し目待ち。",
+        "Bad": "調整が長引き、レンジ相場へ移行する。"}),
     # 2. Strong Downtrend (<-3%)
-    elif trend_return < -3.0:
-        if last_score >= 1: # Downtrend + Strong
-            grade = "普"
-            scenarios["Avg"] = "自律反発。ショートカバー優勢。"
-            scenarios["Good"] = "底打ちを確認し、本格的なリバウンドへ。"
-            scenarios["Bad"] = "あくまで一時的な反発で、再度安値を更新。"
-        elif last_score <= -1: # Downtrend + Weak
-            grade = "悪"
-            scenarios["Avg"] = "下落継続。安値模索の展開。"
-            scenarios["Good"] = "セリングクライマックスを迎え、急反発する。"
-            scenarios["Bad"] = "売りが売りを呼び、パニック的な下げになる。"
-        else:
-            grade = "悪"
-            scenarios["Avg"] = "下落トレンド継続。戻り売り警戒。"
-            scenarios["Good"] = "下げ止まり、底固めの動きへ。"
-            scenarios["Bad"] = "ジリジリと下値を切り下げる。"
-            
+    (-1, 1): ("普", {
+        "Good": "底打ちを確認し、本格的なリバウンドへ。",
+        "Avg": "自律反発。ショートカバー優勢。",
+        "Bad": "あくまで一時的な反発で、再度安値を更新。"}),
+    (-1, -1): ("悪", {
+        "Good": "セリングクライマックスを迎え、急反発する。",
+        "Avg": "下落継続。安値模索の展開。",
+        "Bad": "売りが売りを呼び、パニック的な下げになる。"}),
+    (-1, 0): ("悪", {
+        "Good": "下げ止まり、底固めの動きへ。",
+        "Avg": "下落トレンド継続。戻り売り警戒。",
+        "Bad": "ジリジリと下値を切り下げる。"}),
     # 3. Range / Neutral
-    else:
-        if last_score >= 1: # Range + Strong
-            grade = "良"
-            scenarios["Avg"] = "レンジ上限へのトライ。"
-            scenarios["Good"] = "レンジを上抜け、新たな上昇トレンドへ。"
-            scenarios["Bad"] = "レンジ上限で跳ね返され、再度保ち合いへ。"
-        elif last_score <= -1: # Range + Weak
-            grade = "悪"
-            scenarios["Avg"] = "レンジ下限へのトライ。"
-            scenarios["Good"] = "下限でサポートされ、反発する。"
-            scenarios["Bad"] = "レンジを下抜け、下落トレンド入りする。"
-        else:
-            grade = "普"
-            scenarios["Avg"] = "方向感なし。様子見。"
-            scenarios["Good"] = "材料出現で動意づく。"
-            scenarios["Bad"] = "出来高細り、閑散相場となる。"
-            
-    return grade, scenarios
+    (0, 1): ("良", {
+        "Good": "レンジを上抜け、新たな上昇トレンドへ。",
+        "Avg": "レンジ上限へのトライ。",
+        "Bad": "レンジ上限で跳ね返され、再度保ち合いへ。"}),
+    (0, -1): ("悪", {
+        "Good": "下限でサポートされ、反発する。",
+        "Avg": "レンジ下限へのトライ。",
+        "Bad": "レンジを下抜け、下落トレンド入りする。"}),
+    (0, 0): ("普", {
+        "Good": "材料出現で動意づく。",
+        "Avg": "方向感なし。様子見。",
+        "Bad": "出来高細り、閑散相場となる。"}),
+}
+_SCENARIO_TABLE = {key: (grade, MappingProxyType(scenarios))
+                   for key, (grade, scenarios) in _SCENARIO_TABLE.items()}
 
-def analyze_ticker(ticker, data, start_arg, end_arg):
-    try:
-        if ticker not in data.columns.levels[0]: return None
-        raw = data[ticker].dropna()
-    except KeyError:
+def generate_three_scenarios(trend_return, last_score, last_move):
+    """
+    Generate 3 distinct scenarios: Good (Bull), Avg (Base), Bad (Bear).
+    Returns: Grade, Scenarios Dict
+    """
+    trend_bucket = 1 if trend_return > 3.0 else -1 if trend_return < -3.0 else 0
+    score_bucket = 1 if last_score >= 1 else -1 if last_score <= -1 else 0
+    return _SCENARIO_TABLE[(trend_bucket, score_bucket)]
+
+def generate_three_scenarios_batch(trend_returns, last_scores):
+    """
+    generate_three_scenarios for arrays of inputs: bucket all of them with
+    np.select, then index _SCENARIO_TABLE. Returns a list of (Grade, Scenarios).
+    """
+    trend_returns = np.asarray(trend_returns, dtype=float)
+    last_scores = np.asarray(last_scores)
+    trend = np.select([trend_returns > 3.0, trend_returns < -3.0], [1, -1], default=0)
+    score = np.select([last_scores >= 1, last_scores <= -1], [1, -1], default=0)
+    return [_SCENARIO_TABLE[key] for key in zip(trend.tolist(), score.tolist())]
+
+def _cache_for(data):
+    """Return _ticker_cache, cleared first if it was filled from another frame."""
+    global _ticker_cache_data
+    if data is not _ticker_cache_data:
+        _ticker_cache.clear()
+        _frame_memo.clear()
+        _ticker_cache_data = data
+    return _ticker_cache
+
+def available_tickers(data):
+    """frozenset of the tickers (column level 0) in data, built once per frame."""
+    _cache_for(data)
+    if 'present' not in _frame_memo:
+        _frame_memo['present'] = frozenset(data.columns.get_level_values(0))
+    return _frame_memo['present']
+
+def valid_rows(data):
+    """
+    (time x ticker) bool frame: True where all of a ticker's fields are
+    present. One notna pass over the whole frame, built once per frame.
+    """
+    _cache_for(data)
+    if 'valid' not in _frame_memo:
+        _frame_memo['valid'] = data.notna().T.groupby(level=0, sort=False).all().T
+    return _frame_memo['valid']
+
+def _window_bounds(data, start_arg, end_arg):
+    """
+    Parse both window bounds once for data (see parse_window_bound), so
+    equal windows share memo keys however they were spelled. Empty or
+    unparseable bounds are returned as given.
+    """
+    tz_aware = data.index.tzinfo is not None
+    def parse(value):
+        if not value: return value
+        try:
+            return parse_window_bound(value, tz_aware)
+        except Exception:
+            return value
+    return parse(start_arg), parse(end_arg)
+
+def analyze_ticker(ticker, data, start_arg, end_arg, window_filter=filter_data_by_date):
+    """
+    Memoized per (ticker, start, end, window_filter) for a given data frame.
+    The result dict is shared between callers: copy it before adding fields.
+    """
+    cache = _cache_for(data)
+    # Callers normally pass bounds already parsed for data: try them as given first
+    key = (ticker, start_arg, end_arg, window_filter)
+    if key in cache:
+        return cache[key]
+    start_arg, end_arg = _window_bounds(data, start_arg, end_arg)
+    key = (ticker, start_arg, end_arg, window_filter)
+    if key in cache:
+        return cache[key]
+    if ticker not in available_tickers(data):
+        cache[key] = None
         return None
-    except Exception as e:
-        # Fallback for flat index 
-        if ticker in data.columns:
-            raw = data[ticker].dropna()
-        else:
-            return None
-    df = filter_data_by_date(raw, start_arg, end_arg)
-    if df.empty: return None
-    
-    start_p = df.iloc[0]['Open']
-    end_p = df.iloc[-1]['Close']
-    high_p = df['High'].max()
-    
-    # Convert timestamps to JST for display
-    jst = pytz.timezone('Asia/Tokyo')
+    analyze_tickers([ticker], data, start_arg, end_arg, window_filter)
+    return cache[key]
+
+def analyze_tickers(tickers, data, start_arg, end_arg, window_filter=filter_data_by_date):
+    """
+    Analyze many tickers at once and populate the analyze_ticker cache.
+    Prices, MDD, previous closes, last-day scores and scenarios are
+    computed for all tickers in single vectorized passes.
+    window_filter(df, start, end) cuts each ticker's frame to the analysis
+    window; run_with_baseline.py passes one that also applies US hours and
+    the close-to-close baseline.
+    """
+    start_arg, end_arg = _window_bounds(data, start_arg, end_arg)
+    raws = split_ticker_frames(data, tickers)
+    frames = {}
+    for ticker, raw in raws.items():
+        df = window_filter(raw, start_arg, end_arg)
+        if not df.empty: frames[ticker] = (raw, df)
+    filtered = {t: df for t, (raw, df) in frames.items()}
+
+    prev_closes = calculate_prev_close_batch(frames)
+    summaries = {}
+    bars = {}
+    aligned, index, arrays = align_ticker_frames(filtered)
+    if aligned:
+        mdds = calculate_mdd_batch(arrays['High'], arrays['Low'])
+        starts, highs, ends = calculate_price_summary_batch(arrays['Open'], arrays['High'], arrays['Close'])
+        rets = (ends - starts) / starts * 100
+        mdd_pcts, rfs = calculate_rf_batch(starts, ends, mdds)
+        summaries = {t: (starts[i], highs[i], ends[i], rets[i], mdd_pcts[i], rfs[i]) for i, t in enumerate(aligned)}
+        bars = calculate_last_day_bars(aligned, index, arrays, prev_closes)
+    # Frames that could not be aligned fall back to per-frame extraction
+    for t, df in filtered.items():
+        if t not in bars:
+            bars[t] = _last_day_bar(df, prev_closes.get(t))
+    shapes = score_last_day_bars(bars)
+    outlooks = {}
+    if aligned:
+        outlooks = dict(zip(aligned, generate_three_scenarios_batch(rets, [shapes[t][0] for t in aligned])))
+
+    date_ranges = format_date_ranges(filtered)
+
+    cache = _cache_for(data)
+    for ticker in tickers:
+        res = None
+        if ticker in frames:
+            res = _summarize_ticker(ticker, filtered[ticker], shapes[ticker], summaries.get(ticker),
+                                    outlooks.get(ticker), date_ranges.get(ticker))
+        cache[(ticker, start_arg, end_arg, window_filter)] = res
+
+def split_ticker_frames(data, tickers=None):
+    """
+    Split the (ticker, field) download into {ticker: frame with NaN rows
+    dropped}. Each ticker's slice is kept for the life of the frame, so the
+    MultiIndex is sliced once per ticker however many windows are analyzed.
+    Rows are selected with the shared valid_rows mask instead of a
+    dropna scan per ticker.
+    tickers: restrict to these (missing ones are skipped); default all.
+    """
+    if tickers is None:
+        tickers = data.columns.get_level_values(0).unique()
+    present = available_tickers(data)
+    split = _frame_memo.setdefault('split', {})
+    missing = [t for t in tickers if t in present and t not in split]
+    if missing:
+        valid = valid_rows(data)
+        for t in missing:
+            split[t] = data[t][valid[t].to_numpy()]
+    return {t: split[t] for t in tickers if t in present}
+
+def format_date_ranges(frames):
+    """
+    {ticker: (start, end)} display strings for the first and last bar of
+    many frames, with one vectorized JST conversion and strftime for all.
+    Returns {} if the frames' timestamps can't be combined.
+    """
+    if not frames: return {}
     try:
-        first_ts = df.index[0]
-        last_ts = df.index[-1]
-        
-        if first_ts.tzinfo is not None:
-            first_jst = first_ts.astimezone(jst)
-            last_jst = last_ts.astimezone(jst)
-            start_date_str = first_jst.strftime("%m/%d %H:%M")
-            end_date_str = last_jst.strftime("%m/%d %H:%M") + " JST"
+        stamps = pd.DatetimeIndex([df.index[0] for df in frames.values()] +
+                                  [df.index[-1] for df in frames.values()])
+        if stamps.tz is not None:
+            stamps = stamps.tz_convert(JST).strftime("%m/%d %H:%M")
+            suffix = " JST"
         else:
             # For daily data (no timezone info), just show date
-            start_date_str = first_ts.strftime("%m/%d")
-            end_date_str = last_ts.strftime("%m/%d")
-    except:
-        start_date_str = "N/A"
-        end_date_str = "N/A"
-    
-    ret = (end_p - start_p) / start_p * 100
-    
-    # Calculate Previous Close for accurate Daily % Change
-    prev_close = None
-    try:
-        current_date = df.index[-1].date()
-        past_data = raw[raw.index.date < current_date]
-        if not past_data.empty:
-            prev_close = past_data.iloc[-1]['Close']
+            stamps = stamps.strftime("%m/%d")
+            suffix = ""
     except Exception:
-        pass
+        return {}
+    n = len(frames)
+    return {t: (stamps[i], stamps[n + i] + suffix) for i, t in enumerate(frames)}
 
-    score, desc, move, l_open, l_high, l_close, l_date = analyze_last_day_shape(df, prev_close)
+def _summarize_ticker(ticker, df, shape, summary=None, outlook=None, date_range=None):
+    """
+    summary: precomputed (start, high, end, return, MDD %, RF) for df,
+    outlook: precomputed (grade, scenarios) and date_range: precomputed
+    (start, end) strings from format_date_ranges, if available.
+    """
+    start_p, high_p, end_p, ret, mdd, rf = summary if summary is not None else _frame_summary(df)
+    
+    # Convert timestamps to JST for display
+    if date_range is None:
+        date_range = format_date_ranges({ticker: df}).get(ticker, ("N/A", "N/A"))
+    start_date_str, end_date_str = date_range
     
-    grade, scenarios = generate_three_scenarios(ret, score, move)
+    score, desc, move, l_open, l_high, l_close, l_date = shape
     
-    mdd, rf = calculate_mdd_rf(df)
+    grade, scenarios = outlook if outlook is not None else generate_three_scenarios(ret, score, move)
     
+    trend_str = f"Trend: {start_p:.2f}->{high_p:.2f}->{end_p:.2f} ({ret:+.1f}%) [{start_date_str} - {end_date_str}] (始値->高値->終値) **[RF:{rf:.2f}]**"
+    last_str = f"Last: {l_open:.2f}->{l_high:.2f}->{l_close:.2f} ({move:+.1f}%) [{l_date}] (始値->高値->終値)"
+
     return {
         "Ticker": ticker,
         "Start": start_p,
@@ -350,48 +861,53 @@ def analyze_ticker(ticker, data, start_arg, end_arg):
         "Grade": grade,
         "Scenarios": scenarios,
         "MDD": mdd,
-        "RF": rf
+        "RF": rf,
+        # Preformatted report lines; identical wherever the stock is listed
+        "TrendStr": trend_str,
+        "LastStr": last_str
     }
 
-def analyze_sector(sector_ticker, holdings, data, start_arg=None, end_arg=None):
+def analyze_sector(sector_ticker, holdings, data, start_arg=None, end_arg=None, window_filter=filter_data_by_date):
     # Use names from either standard or theme dict
-    sec_name = SECTOR_NAMES.get(sector_ticker, THEME_NAMES.get(sector_ticker, sector_ticker))
+    sec_name = DISPLAY_NAMES.get(sector_ticker, sector_ticker)
 
-    s_res = analyze_ticker(sector_ticker, data, start_arg, end_arg)
+    s_res = analyze_ticker(sector_ticker, data, start_arg, end_arg, window_filter)
     if not s_res: return None
     
     stats = []
     
     for stock in holdings:
-        st_res = analyze_ticker(stock, data, start_arg, end_arg)
+        st_res = analyze_ticker(stock, data, start_arg, end_arg, window_filter)
         if not st_res: continue
+        # Cached result is shared across sectors; Role/Reason are per-sector
+        st_res = dict(st_res)
         
         rel_trend = st_res['Return'] - s_res['Return']
-        role = "NEUTRAL"
-        reason = ""
+        is_engine = rel_trend > 0
         
-        if rel_trend > 0:
-            role = "ENGINE (牽引)"
+        if is_engine:
+            role = ROLE_ENGINE
             if st_res['LastScore'] >= 0:
                 reason = f"トレンド牽引 (+{st_res['Return']:.1f}%)"
             else:
                 reason = f"トレンドは強いが、直近で失速 ({st_res['LastDesc']})"
         else:
-            role = "BRAKE (重石)"
+            role = ROLE_BRAKE
             if st_res['LastScore'] > 0:
                 reason = f"出遅れだが、直近は買われている ({st_res['LastDesc']})"
             else:
                 reason = f"トレンドも直近も弱い ({st_res['LastDesc']})"
                 
         st_res['Role'] = role
+        st_res['IsEngine'] = is_engine
         st_res['Reason'] = reason
+        st_res['Line'] = f"- {st_res['Ticker']}: {st_res['TrendStr']} / {st_res['LastStr']} -> {reason}"
         stats.append(st_res)
 
-    stats_df = pd.DataFrame(stats)
-    if not stats_df.empty:
-        stats_df = stats_df.sort_values("Return", ascending=False)
+    # A handful of dicts: a stable list sort beats building a DataFrame to sort
+    stats.sort(key=itemgetter('Return'), reverse=True)
         
-    engine_count = len([s for s in stats if "ENGINE" in s['Role']])
+    engine_count = sum(s['IsEngine'] for s in stats)
     total_count = len(stats)
     
     quality = "普通 (Mixed)"
@@ -409,6 +925,7 @@ def analyze_sector(sector_ticker, holdings, data, start_arg=None, end_arg=None):
     return {
         "sector": sector_ticker,
         "name": sec_name,
+        "title": _title(sector_ticker),
         "return": s_res['Return'],
         "start_p": s_res['Start'],
         "end_p": s_res['End'],
@@ -419,65 +936,137 @@ def analyze_sector(sector_ticker, holdings, data, start_arg=None, end_arg=None):
         "grade": s_res['Grade'],
         "quality": quality,
         "scenarios": s_res['Scenarios'],
-        "stats": stats_df,
+        "stats": stats,
         "MDD": s_res['MDD'],
         "RF": s_res['RF']
     }
 
+def analyze_sectors(executor, sector_groups, data, start_arg=None, end_arg=None,
+                    window_filter=filter_data_by_date):
+    """
+    Run analyze_sector for every {sector: holdings} entry of every group on executor.
+    All groups are queued before any result is awaited, so the pool never idles
+    between groups. Returns one {sector: result} per group, in input order,
+    skipping sectors without data.
+    """
+    pending = [{sector: executor.submit(analyze_sector, sector, holdings, data, start_arg, end_arg, window_filter)
+                for sector, holdings in sectors.items()}
+               for sectors in sector_groups]
+    grouped = []
+    for futures in pending:
+        results = {}
+        for sector, future in futures.items():
+            res = future.result()
+            if res: results[sector] = res
+        grouped.append(results)
+    return grouped
+
 def generate_narrative_report(results, index_results, macro_results, theme_results, start_dt_str, end_dt_str):
     analyzed_range = f"{start_dt_str} 〜 {end_dt_str}"
     if index_results:
         analyzed_range = index_results[0]['DateRange'] 
 
-    report = []
-    report.append("【天才投資家レポート】")
-    report.append(f"分析期間: {analyzed_range}\n")
+    out = io.StringIO()
+    def emit(line=""):
+        out.write(line)
+        out.write("\n")
+
+    emit("【天才投資家レポート】")
+    emit(f"分析期間: {analyzed_range}\n")
     
     # 1. Indices
-    report.append("### ① 全体観 (Indices)")
+    emit("### ① 全体観 (Indices)")
     for idx_res in index_results:
         idx = idx_res['Ticker']
-        name = SECTOR_NAMES.get(idx, idx)
         
-        report.append(f"**{name} ({idx})**: {idx_res['Grade']}")
-        report.append(f"  Price: {idx_res['Start']:.2f} -> {idx_res['End']:.2f} ({idx_res['Return']:+.2f}%) [{idx_res['DateRange']}]")
-        report.append(f"  📊 **リカバリー・ファクター (RF): {idx_res['RF']:.2f}** | **最大ドローダウン (MDD): {idx_res['MDD']:.1f}%**")
-        report.append(f"  直近: {idx_res['LastDesc']} ({idx_res['LastMove']:+.1f}%) [{idx_res['LastDate']}]")
+        emit(f"**{_title(idx)}**: {idx_res['Grade']}\n"
+             f"  Price: {idx_res['Start']:.2f} -> {idx_res['End']:.2f} ({idx_res['Return']:+.2f}%) [{idx_res['DateRange']}]\n"
+             f"  📊 **リカバリー・ファクター (RF): {idx_res['RF']:.2f}** | **最大ドローダウン (MDD): {idx_res['MDD']:.1f}%**\n"
+             f"  直近: {idx_res['LastDesc']} ({idx_res['LastMove']:+.1f}%) [{idx_res['LastDate']}]")
         
         # Drivers/Draggers Logic (Simplified for standard sectors)
-        related_sectors = []
-        if idx == "QQQ": related_sectors = ["XLK", "XLC", "XLY"]
-        elif idx == "DIA": related_sectors = ["XLI", "XLF", "XLV"]
-        else: related_sectors = ["XLK", "XLF", "XLV", "XLY", "XLI", "XLE"]
-        
-        drivers = []
-        draggers = []
-        
-        for sec_ticker in related_sectors:
-            if sec_ticker in results:
-                sec_ret = results[sec_ticker]['return']
-                sec_name = results[sec_ticker]['name']
-                if sec_ret > idx_res['Return'] + 0.5:
-                    drivers.append(f"- {sec_name}: {sec_ret:+.1f}%")
-                elif sec_ret < idx_res['Return'] - 0.5:
-                    draggers.append(f"- {sec_name}: {sec_ret:+.1f}%")
-                    
+        related = [results[t] for t in INDEX_SECTORS.get(idx, DEFAULT_INDEX_SECTORS) if t in results]
+        idx_ret = idx_res['Return']
+        drivers = "\n".join(f"- {r['name']}: {r['return']:+.1f}%" for r in related if r['return'] > idx_ret + 0.5)
+        draggers = "\n".join(f"- {r['name']}: {r['return']:+.1f}%" for r in related if r['return'] < idx_ret - 0.5)
         if drivers:
-            report.append("🔥 **Engine (牽引)**:")
-            report.extend(drivers)
+            emit("🔥 **Engine (牽引)**:\n" + drivers)
         if draggers: 
-            report.append("🧊 **Brake (重石)**:")
-            report.extend(draggers)
-        report.append("")
+            emit("🧊 **Brake (重石)**:\n" + draggers)
+        emit("")
 
-    report.append("="*40 + "\n")
+    emit("="*40 + "\n")
     
     # 2. Sector Analysis (Standard)
-    sorted_secs = sorted(results.values(), key=lambda x: x['return'], reverse=True)
-    winner = sorted_secs[0]
-    loser = sorted_secs[-1]
+    sorted_secs = sorted(results.values(), key=itemgetter('return'), reverse=True)
+    if sorted_secs:
+        _append_macro_conclusion(emit, results, sorted_secs[0], sorted_secs[-1])
 
-    # Macro Conclusion
+    # Standard Sectors
+    for res in sorted_secs:
+        _append_sector_details(emit, res)
+
+    # 3. Thematic Sectors Section (skipped, like the rankings below, when --sectors selects none)
+    if theme_results:
+        emit("### ③ テーマ別・注目セクター分析 (New Themes)")
+        emit("伝統的セクターに加え、注目度の高い10のテーマを分析します。\n")
+
+        sorted_themes = sorted(theme_results.values(), key=itemgetter('return'), reverse=True)
+        for res in sorted_themes:
+            _append_sector_details(emit, res)
+
+    # 4. Rankings Section (Combined?)
+    # User asked for "Existing things kept as is", so standard rankings first?
+    # Or maybe combine them? 
+    # Let's keep existing Rankings as "Sector Ranking" (Original 11)
+    # And maybe add a "Theme Ranking"? 
+    # Or just mix them? 
+    # For now, I will keep standard rankings as requested "Existing things kept", 
+    # and maybe append Theme rankings. Or mix if user didn't specify. 
+    # "Existing ... kept as is". So I will keep the original ranking section for original sectors.
+    
+    if results:
+        emit("### ④ リカバリー・ファクター (RF) ランキング (Standard 11)")
+        emit("「リスクあたりのリターン効率」を比較します。数値が高いほど優秀です。\n")
+
+        # Sector Ranking
+        sorted_rf_sectors = sorted(results.values(), key=itemgetter('RF'), reverse=True)
+        emit("【セクター別 RF ランキング】")
+        emit(_sector_rf_ranking(sorted_rf_sectors) + "\n")
+
+        # Stock Ranking (Standard)
+        emit("【銘柄別 RF ランキング (Standard Top 10)】")
+        emit(_stock_rf_ranking(_top_rf_stocks(results)))
+        emit("\n" + "="*40 + "\n")
+
+    if theme_results:
+        # Theme Rankings
+        emit("### ⑤ テーマ別 RF ランキング (New)")
+
+        # Theme Sector Ranking
+        sorted_rf_themes = sorted(theme_results.values(), key=itemgetter('RF'), reverse=True)
+        emit("【テーマ別 RF ランキング】")
+        emit(_sector_rf_ranking(sorted_rf_themes) + "\n")
+
+        # Theme Stock Ranking
+        emit("【テーマ銘柄別 RF ランキング (Theme Top 10)】")
+        emit(_stock_rf_ranking(_top_rf_stocks(theme_results)))
+
+        emit("\n" + "="*40 + "\n")
+
+    # 4. Macro Section (Renumbered to 6)
+    emit("### ⑥ 注目マクロ指標 (Macro)")
+    for res in macro_results:
+        emit(f"**{_title(res['Ticker'])}**: {res['Return']:+.2f}%\n"
+             f"  Price: {res['Start']:.2f} -> {res['End']:.2f} [{res['DateRange']}]\n"
+             f"  直近: {res['LastDesc']} ({res['LastMove']:+.2f}%) [{res['LastDate']}]\n"
+             f"  RF: {res['RF']:.2f} | MDD: {res['MDD']:.1f}%\n")
+    
+    # Drop the final newline, matching the former "\n".join(lines)
+    return out.getvalue()[:-1]
+
+def _append_macro_conclusion(emit, results, winner, loser):
+    """Section ②: money flow from the worst to the best standard sector."""
     risk_on_score = 0
     if "XLK" in results and "XLY" in results:
         risk_on_avg = (results["XLK"]["return"] + results["XLY"]["return"]) / 2
@@ -505,185 +1094,137 @@ def generate_narrative_report(results, index_results, macro_results, theme_resul
     else:
         flow_desc = "セクター間の循環色が強く、方向感を探る展開です。"
 
-    report.append("### ② マクロ結論: 資金流動")
-    report.append(f"資金は**「{loser['name']}」から「{winner['name']}」へ**シフトしています。")
-    report.append(f"【真実の眼】 {flow_desc}")
-    report.append(f"勝者({winner['name']})は{winner['quality']}な買いが入っており、敗者({loser['name']})は資金流出が鮮明です。")
-    report.append("\n" + "-"*20 + "\n")
+    emit("### ② マクロ結論: 資金流動")
+    emit(f"資金は**「{loser['name']}」から「{winner['name']}」へ**シフトしています。")
+    emit(f"【真実の眼】 {flow_desc}")
+    emit(f"勝者({winner['name']})は{winner['quality']}な買いが入っており、敗者({loser['name']})は資金流出が鮮明です。")
+    emit("\n" + "-"*20 + "\n")
 
-    # Standard Sectors
-    for res in sorted_secs:
-        _append_sector_details(report, res)
+def _title(ticker):
+    """Report header for a ticker: the precomputed TITLES entry when configured."""
+    title = TITLES.get(ticker)
+    return title if title is not None else f"{DISPLAY_NAMES.get(ticker, ticker)} ({ticker})"
 
-    # 3. Thematic Sectors Section
-    report.append("### ③ テーマ別・注目セクター分析 (New Themes)")
-    report.append("伝統的セクターに加え、注目度の高い10のテーマを分析します。\n")
-    
-    sorted_themes = sorted(theme_results.values(), key=lambda x: x['return'], reverse=True)
-    for res in sorted_themes:
-        _append_sector_details(report, res)
+RANK_MEDALS = ("🥇", "🥈", "🥉")
 
-    # 4. Rankings Section (Combined?)
-    # User asked for "Existing things kept as is", so standard rankings first?
-    # Or maybe combine them? 
-    # Let's keep existing Rankings as "Sector Ranking" (Original 11)
-    # And maybe add a "Theme Ranking"? 
-    # Or just mix them? 
-    # For now, I will keep standard rankings as requested "Existing things kept", 
-    # and maybe append Theme rankings. Or mix if user didn't specify. 
-    # "Existing ... kept as is". So I will keep the original ranking section for original sectors.
-    
-    report.append("### ④ リカバリー・ファクター (RF) ランキング (Standard 11)")
-    report.append("「リスクあたりのリターン効率」を比較します。数値が高いほど優秀です。\n")
-    
-    # Sector Ranking
-    sorted_rf_sectors = sorted(results.values(), key=lambda x: x['RF'], reverse=True)
-    report.append("【セクター別 RF ランキング】")
-    rank_str_list = []
-    medals = ["🥇", "🥈", "🥉"]
-    for i, res in enumerate(sorted_rf_sectors):
-        rank_icon = medals[i] if i < 3 else f"{i+1}."
-        rank_str_list.append(f"{rank_icon} **{res['name']} ({res['sector']})**: RF {res['RF']:.2f} (Return: {res['return']:+.1f}% / MDD: {res['MDD']:.1f}%)")
-    report.append(" ".join(rank_str_list))
-    report.append("")
-    
-    # Stock Ranking (Standard)
-    all_stocks = []
-    for res in results.values():
-        if not res['stats'].empty:
-            for _, row in res['stats'].iterrows():
-                all_stocks.append(row)
-    
-    sorted_stocks_rf = sorted(all_stocks, key=lambda x: x['RF'], reverse=True)
-    report.append("【銘柄別 RF ランキング (Standard Top 10)】")
-    top_str_list = []
-    for i, row in enumerate(sorted_stocks_rf[:10]):
-        rank_icon = medals[i] if i < 3 else f"{i+1}."
-        top_str_list.append(f"{rank_icon} **{row['Ticker']}**: RF {row['RF']:.2f} (Return: {row['Return']:+.1f}% / MDD: {row['MDD']:.1f}%)")
-    report.append(" ".join(top_str_list))
-    report.append("\n" + "="*40 + "\n")
-
-    # Theme Rankings
-    report.append("### ⑤ テーマ別 RF ランキング (New)")
-    
-    # Theme Sector Ranking
-    sorted_rf_themes = sorted(theme_results.values(), key=lambda x: x['RF'], reverse=True)
-    report.append("【テーマ別 RF ランキング】")
-    rank_str_list = []
-    for i, res in enumerate(sorted_rf_themes):
-        rank_icon = medals[i] if i < 3 else f"{i+1}."
-        rank_str_list.append(f"{rank_icon} **{res['name']} ({res['sector']})**: RF {res['RF']:.2f} (Return: {res['return']:+.1f}% / MDD: {res['MDD']:.1f}%)")
-    report.append(" ".join(rank_str_list))
-    report.append("")
-
-    # Theme Stock Ranking
-    all_theme_stocks = []
-    for res in theme_results.values():
-        if not res['stats'].empty:
-            for _, row in res['stats'].iterrows():
-                all_theme_stocks.append(row)
-    
-    sorted_theme_stocks_rf = sorted(all_theme_stocks, key=lambda x: x['RF'], reverse=True)
-    report.append("【テーマ銘柄別 RF ランキング (Theme Top 10)】")
-    top_str_list = []
-    for i, row in enumerate(sorted_theme_stocks_rf[:10]):
-        rank_icon = medals[i] if i < 3 else f"{i+1}."
-        top_str_list.append(f"{rank_icon} **{row['Ticker']}**: RF {row['RF']:.2f} (Return: {row['Return']:+.1f}% / MDD: {row['MDD']:.1f}%)")
-    report.append(" ".join(top_str_list))
-    
-    report.append("\n" + "="*40 + "\n")
+def _rank_icon(i):
+    return RANK_MEDALS[i] if i < 3 else f"{i+1}."
 
-    # 4. Macro Section (Renumbered to 6)
-    report.append("### ⑥ 注目マクロ指標 (Macro)")
-    for res in macro_results:
-        m_ticker = res['Ticker']
-        m_name = MACRO_NAMES.get(m_ticker, m_ticker)
-        report.append(f"**{m_name} ({m_ticker})**: {res['Return']:+.2f}%")
-        report.append(f"  Price: {res['Start']:.2f} -> {res['End']:.2f} [{res['DateRange']}]")
-        report.append(f"  直近: {res['LastDesc']} ({res['LastMove']:+.2f}%) [{res['LastDate']}]")
-        report.append(f"  RF: {res['RF']:.2f} | MDD: {res['MDD']:.1f}%")
-        report.append("")
-    
-    return "\n".join(report)
+def _sector_rf_ranking(sorted_results):
+    """One-line RF ranking of sector results, already sorted best first."""
+    return " ".join(
+        f"{_rank_icon(i)} **{res['title']}**: RF {res['RF']:.2f} (Return: {res['return']:+.1f}% / MDD: {res['MDD']:.1f}%)"
+        for i, res in enumerate(sorted_results))
+
+def _stock_rf_ranking(top):
+    """One-line RF ranking of the _top_rf_stocks rows."""
+    return " ".join(
+        f"{_rank_icon(i)} **{row['Ticker']}**: RF {row['RF']:.2f} (Return: {row['Return']:+.1f}% / MDD: {row['MDD']:.1f}%)"
+        for i, row in enumerate(top))
 
-def _append_sector_details(report, res):
-    sec_name = res['name']
-    ticker = res['sector']
+def _top_rf_stocks(sector_results, n=10):
+    """Top n holdings by RF across all sectors' stats, via one partial sort (ties keep sector order)."""
+    rows = itertools.chain.from_iterable(res['stats'] for res in sector_results.values())
+    return heapq.nlargest(n, rows, key=itemgetter('RF'))
+
+def _holding_lines(rows):
+    """The holdings' report lines (built once in analyze_sector), one per line."""
+    return "\n".join(row['Line'] for row in rows)
+
+def _append_sector_details(emit, res):
     stats = res['stats']
     
-    engines = stats[stats['Role'].str.contains('ENGINE')]
-    brakes = stats[stats['Role'].str.contains('BRAKE')]
+    # Every holding is either ENGINE or BRAKE: split in one pass, order kept
+    engines, brakes = [], []
+    for r in stats:
+        (engines if r['IsEngine'] else brakes).append(r)
     
-    report.append(f"## {sec_name} ({ticker})")
-    report.append(f"**判定**: {res['grade']}")
-    report.append(f"**資金の質の判定**: {res['quality']}")
+    emit(f"## {res['title']}\n"
+         f"**判定**: {res['grade']}\n"
+         f"**資金の質の判定**: {res['quality']}\n"
+         f"**Price**: ${res['start_p']:.2f} -> ${res['end_p']:.2f} ({res['return']:+.2f}%) [{res['date_range']}]\n"
+         f"📊 **リカバリー・ファクター (RF): {res['RF']:.2f}** | **最大ドローダウン (MDD): {res['MDD']:.1f}%**\n"
+         f"**直近**: {res['last_desc']} [{res['last_date']}]")
     
-    report.append(f"**Price**: ${res['start_p']:.2f} -> ${res['end_p']:.2f} ({res['return']:+.2f}%) [{res['date_range']}]")
-    report.append(f"📊 **リカバリー・ファクター (RF): {res['RF']:.2f}** | **最大ドローダウン (MDD): {res['MDD']:.1f}%**")
-    report.append(f"**直近**: {res['last_desc']} [{res['last_date']}]")
+    if engines:
+        emit("🔥 **Engine (牽引)**:")
+        emit(_holding_lines(engines))
     
-    if not engines.empty:
-        report.append("🔥 **Engine (牽引)**:")
-        for _, row in engines.iterrows():
-            trend_str = f"Trend: {row['Start']:.2f}->{row['High']:.2f}->{row['End']:.2f} ({row['Return']:+.1f}%) [{row['DateRange']}] (始値->高値->終値) **[RF:{row['RF']:.2f}]**"
-            last_str = f"Last: {row['LastOpen']:.2f}->{row['LastHigh']:.2f}->{row['LastClose']:.2f} ({row['LastMove']:+.1f}%) [{row['LastDate']}] (始値->高値->終値)"
-            report.append(f"- {row['Ticker']}: {trend_str} / {last_str} -> {row['Reason']}")
+    if brakes:
+        emit("🧊 **Brake (重石)**:")
+        emit(_holding_lines(brakes))
     
-    if not brakes.empty:
-        report.append("🧊 **Brake (重石)**:")
-        for _, row in brakes.iterrows():
-            trend_str = f"Trend: {row['Start']:.2f}->{row['High']:.2f}->{row['End']:.2f} ({row['Return']:+.1f}%) [{row['DateRange']}] (始値->高値->終値) **[RF:{row['RF']:.2f}]**"
-            last_str = f"Last: {row['LastOpen']:.2f}->{row['LastHigh']:.2f}->{row['LastClose']:.2f} ({row['LastMove']:+.1f}%) [{row['LastDate']}] (始値->高値->終値)"
-            report.append(f"- {row['Ticker']}: {trend_str} / {last_str} -> {row['Reason']}")
-    
-    report.append("\n" + "-"*20 + "\n")
+    emit("\n" + "-"*20 + "\n")
 
-def main():
+def parse_cli_date(value):
+    """--start/--end value as a datetime: stdlib ISO parsing, pandas for anything looser."""
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return pd.to_datetime(value)
+
+def main(window_filter=filter_data_by_date):
+    """
+    CLI entry point. window_filter: per-ticker window filter used for the
+    analysis (see analyze_tickers).
+    """
     parser = argparse.ArgumentParser()
     parser.add_argument('--start', type=str)
     parser.add_argument('--end', type=str)
     parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--sectors', type=str)  # e.g. XLK,XLF,GDX; default all
     args = parser.parse_args()
 
-    jst = pytz.timezone('Asia/Tokyo')
-    end_dt = datetime.now(jst)
+    selected = None
+    if args.sectors:
+        selected = tuple(dict.fromkeys(s.strip().upper() for s in args.sectors.split(',') if s.strip()))
+        unknown = [s for s in selected if s not in SECTORS and s not in THEME_SECTORS]
+        if unknown: parser.error(f"unknown sectors: {', '.join(unknown)}")
+    tickers = unique_tickers(selected)
+
+    end_dt = datetime.now(JST)
     
-    if args.end: end_dt = pd.to_datetime(args.end)
+    if args.end: end_dt = parse_cli_date(args.end)
     start_dt = end_dt - timedelta(days=args.days)
-    if args.start: start_dt = pd.to_datetime(args.start)
+    if args.start: start_dt = parse_cli_date(args.start)
         
     start_str = start_dt.strftime("%Y-%m-%d")
     end_str = end_dt.strftime("%Y-%m-%d")
     
     print(f"Analyzing {start_str} to {end_str}...")
     
-    data = fetch_data(start_str, end_str)
+    # A default run only needs the latest bars: share the rolling snapshot
+    rolling = not args.start and not args.end and args.days <= ROLLING_PERIOD_DAYS
+    data = fetch_data(None if rolling else start_str, end_str, tickers)
     if data is None: return
 
+    # Parse the window once, in the data's time zone, for every ticker below
+    tz_aware = data.index.tz is not None
+    start_ts = parse_window_bound(start_str, tz_aware)
+    end_ts = parse_window_bound(end_str, tz_aware)
+
+    # Analyze every unique ticker once; sector loops below hit the cache
+    analyze_tickers(tickers, data, start_ts, end_ts, window_filter)
+
     index_results = []
     for idx in INDICES:
-        res = analyze_ticker(idx, data, start_str, end_str)
+        res = analyze_ticker(idx, data, start_ts, end_ts, window_filter)
         if res: index_results.append(res)
 
     macro_results = []
     for m in MACRO_TICKERS:
-        res = analyze_ticker(m, data, start_str, end_str)
+        res = analyze_ticker(m, data, start_ts, end_ts, window_filter)
         if res: macro_results.append(res)
 
-    results = {}
-    for sector, holdings in SECTORS.items():
-        res = analyze_sector(sector, holdings, data, start_str, end_str)
-        if res: results[sector] = res
-        
-    theme_results = {}
-    for sector, holdings in THEME_SECTORS.items():
-        res = analyze_sector(sector, holdings, data, start_str, end_str)
-        if res: theme_results[sector] = res
+    # Sectors only read the shared frame and the warm cache: run them concurrently
+    with ThreadPoolExecutor(max_workers=SECTOR_WORKERS) as ex:
+        results, theme_results = analyze_sectors(
+            ex, (select_sectors(SECTORS, selected), select_sectors(THEME_SECTORS, selected)),
+            data, start_ts, end_ts, window_filter)
 
     if results or theme_results:
         report = generate_narrative_report(results, index_results, macro_results, theme_results, start_str, end_str)
-        with open("analysis_output.txt", "w", encoding='utf-8') as f:
-            f.write(report)
+        Path("analysis_output.txt").write_text(report, encoding='utf-8')
         print("Report Generated.")
 
 if __name__ == "__main__":
@@ -2,11 +2,11 @@
 
 The last bar of a normal US session is the 15-minute bar starting at 15:45 NY,
 which is JST 04:45 during DST (EDT) / JST 05:45 during EST.
-pytz handles the DST/EST switch automatically from each bar's timestamp.
+zoneinfo handles the DST/EST switch automatically from each bar's timestamp.
 """
-import pytz
+from zoneinfo import ZoneInfo
 
-NY = pytz.timezone("America/New_York")
+NY = ZoneInfo("America/New_York")
 
 
 def filter_to_us_regular_hours(df):
@@ -2,6 +2,9 @@ import requests
 import os
 import time
 
+# One keep-alive connection for every webhook post of a run
+SESSION = requests.Session()
+
 def send_discord_message(content=None, file_path=None):
     webhook_url = os.environ.get("DISCORD_WEBHOOK_URL")
     if not webhook_url:
@@ -22,7 +25,7 @@ def send_discord_message(content=None, file_path=None):
              return False
 
     try:
-        response = requests.post(webhook_url, data=data, files=files)
+        response = SESSION.post(webhook_url, data=data, files=files)
         response.raise_for_status()
         print("Message/File sent successfully.")
     except Exception as e:
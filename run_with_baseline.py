@@ -18,14 +18,18 @@ import argparse
 import os
 import sys
 from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
 
 import pandas as pd
-import pytz
+
+import analyze_sectors
+from market_hours_filter import filter_to_us_regular_hours
+
+JST = ZoneInfo("Asia/Tokyo")
 
 
 def compute_auto_baseline(market_type: str = "US"):
-    jst = pytz.timezone("Asia/Tokyo")
-    now_jst = datetime.now(jst)
+    now_jst = datetime.now(JST)
 
     if market_type.upper() == "US":
         ref_date = (now_jst - timedelta(days=1)).date()
@@ -52,12 +56,15 @@ def compute_auto_baseline(market_type: str = "US"):
 def _apply_close_to_close(df):
     if df is None or df.empty or len(df) < 2:
         return df
-    first_date = df.index[0].date()
-    first_day = df[df.index.date == first_date]
-    rest = df[df.index.date > first_date]
+    # Index is sorted: the baseline day is a contiguous head ending where the
+    # next calendar day starts (DateOffset keeps wall-clock midnight across DST)
+    next_day = df.index[0].normalize() + pd.DateOffset(days=1)
+    split = df.index.searchsorted(next_day, side='left')
+    first_day = df.iloc[:split]
+    rest = df.iloc[split:]
     if first_day.empty or rest.empty:
         return df
-    baseline_close = first_day.iloc[-1]['Close']
+    baseline_close = first_day['Close'].to_numpy()[-1]
     baseline_ts = first_day.index[-1]
     row = {}
     for col in df.columns:
@@ -69,17 +76,10 @@ def _apply_close_to_close(df):
     return pd.concat([synthetic, rest])
 
 
-def install_us_filter_and_baseline():
-    import analyze_sectors
-    from market_hours_filter import filter_to_us_regular_hours
-
-    original = analyze_sectors.filter_data_by_date
-
-    def patched(df, start=None, end=None):
-        df = filter_to_us_regular_hours(original(df, start, end))
-        return _apply_close_to_close(df)
-
-    analyze_sectors.filter_data_by_date = patched
+def us_close_to_close_filter(df, start=None, end=None):
+    """Window filter for analyze_sectors.main: date window, US regular hours, then close-to-close."""
+    df = filter_to_us_regular_hours(analyze_sectors.filter_data_by_date(df, start, end))
+    return _apply_close_to_close(df)
 
 
 def main():
@@ -87,15 +87,16 @@ def main():
     parser.add_argument("--market", default=os.environ.get("MARKET_TYPE", "US"))
     parser.add_argument("--start", type=str)
     parser.add_argument("--end", type=str)
+    parser.add_argument("--sectors", type=str)
     args, _ = parser.parse_known_args()
 
-    if args.start or args.end:
+    manual = bool(args.start or args.end)
+    if manual:
         new_argv = ["analyze_sectors.py"]
         if args.start:
             new_argv += ["--start", args.start]
         if args.end:
             new_argv += ["--end", args.end]
-        print(f"[MANUAL] Forwarding to analyze_sectors: {' '.join(new_argv[1:])}")
     else:
         baseline, ref, label = compute_auto_baseline(args.market)
         start_str = baseline.strftime("%Y-%m-%d")
@@ -103,14 +104,19 @@ def main():
         print(f"[AUTO] {label}")
         print(f"[AUTO] market={args.market} baseline={start_str} ref={end_str} weekday={ref.weekday()}")
         new_argv = ["analyze_sectors.py", "--start", start_str, "--end", end_str]
+    if args.sectors:
+        new_argv += ["--sectors", args.sectors]
+    if manual:
+        # Logged once the argv is complete, so forwarded flags all show up
+        print(f"[MANUAL] Forwarding to analyze_sectors: {' '.join(new_argv[1:])}")
 
+    window_filter = analyze_sectors.filter_data_by_date
     if args.market.upper() == "US":
-        install_us_filter_and_baseline()
+        window_filter = us_close_to_close_filter
         print("[FILTER] US 9:30-15:45 NY + close-to-close baseline installed")
 
     sys.argv = new_argv
-    import analyze_sectors
-    analyze_sectors.main()
+    analyze_sectors.main(window_filter=window_filter)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,135 @@
+"""The batched (time x ticker) kernels agree with plain per-ticker pandas."""
+import itertools
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import analyze_sectors as a
+
+
+def make_frames(n_tickers=6, seed=0):
+    """Intraday OHLC frames of different lengths, with gaps, in NY time."""
+    rng = np.random.default_rng(seed)
+    base = pd.date_range("2026-01-05 09:30", periods=400, freq="15min", tz=a.NY)
+    frames = {}
+    for i in range(n_tickers):
+        idx = base[i * 7:len(base) - i * 5]
+        idx = idx[rng.random(len(idx)) > 0.15]
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, len(idx))))
+        open_ = close * (1 + rng.normal(0, 0.001, len(idx)))
+        frames[f"T{i}"] = pd.DataFrame({
+            "Open": open_,
+            "High": np.maximum(open_, close) * 1.001,
+            "Low": np.minimum(open_, close) * 0.999,
+            "Close": close,
+        }, index=idx)
+    # Steady climb: no drawdown at all, so RF takes its 99.99 cap
+    up = np.linspace(10, 20, 50)
+    frames["UP"] = pd.DataFrame({"Open": up, "High": up, "Low": up, "Close": up}, index=base[:50])
+    return frames
+
+
+def stack(frames, field):
+    """(time x ticker) array of one field over the sorted union of the indexes."""
+    return pd.concat({t: df[field] for t, df in frames.items()}, axis=1, sort=True).to_numpy()
+
+
+def reference_summary(df):
+    """Return %, MDD % and RF as originally computed per ticker."""
+    start, end = df["Open"].iloc[0], df["Close"].iloc[-1]
+    peak = df["High"].cummax()
+    mdd = ((df["Low"] - peak) / peak).min()
+    ret = (end - start) / start
+    rf = (99.99 if ret > 0 else 0.0) if mdd == 0 else ret / abs(mdd)
+    return ret * 100, mdd * 100, rf
+
+
+class MddBatchTest(unittest.TestCase):
+    def test_matches_per_frame(self):
+        frames = make_frames()
+        mdds = a.calculate_mdd_batch(stack(frames, "High"), stack(frames, "Low"))
+        np.testing.assert_allclose(mdds * 100, [reference_summary(df)[1] for df in frames.values()])
+        self.assertEqual(mdds[list(frames).index("UP")], 0)
+
+    def test_analyze_tickers_matches_per_frame(self):
+        frames = make_frames()
+        data = pd.concat(frames, axis=1, sort=True)
+        start, end = "2026-01-06", "2026-01-12 12:00"
+        a.analyze_tickers(list(frames), data, start, end)
+        for t, df in frames.items():
+            res = a.analyze_ticker(t, data, start, end)
+            window = a.filter_data_by_date(df, *a._window_bounds(data, start, end))
+            if window.empty:
+                self.assertIsNone(res, t)
+                continue
+            np.testing.assert_allclose([res["Return"], res["MDD"], res["RF"]], reference_summary(window), err_msg=t)
+
+
+class RfBatchTest(unittest.TestCase):
+    def test_matches_per_frame(self):
+        frames = make_frames()
+        starts = np.array([df["Open"].iloc[0] for df in frames.values()])
+        ends = np.array([df["Close"].iloc[-1] for df in frames.values()])
+        mdds = a.calculate_mdd_batch(stack(frames, "High"), stack(frames, "Low"))
+        mdd_pcts, rfs = a.calculate_rf_batch(starts, ends, mdds)
+        expected = [reference_summary(df)[1:] for df in frames.values()]
+        np.testing.assert_allclose(np.column_stack([mdd_pcts, rfs]), expected)
+        self.assertEqual(rfs[list(frames).index("UP")], 99.99)
+
+    def test_no_drawdown(self):
+        # Capped at 99.99 on a gain, 0.0 when flat or down
+        mdd_pcts, rfs = a.calculate_rf_batch(np.full(4, 100.0), np.array([110.0, 110.0, 100.0, 90.0]),
+                                             np.array([-0.05, 0.0, 0.0, 0.0]))
+        np.testing.assert_allclose(mdd_pcts, [-5.0, 0.0, 0.0, 0.0])
+        np.testing.assert_allclose(rfs, [2.0, 99.99, 0.0, 0.0])
+
+
+class AlignedBlockTest(unittest.TestCase):
+    def test_block_matches_frames(self):
+        frames = make_frames()
+        frames["EMPTY"] = frames["T0"].iloc[:0]
+        tickers, index, arrays = a.align_ticker_frames(frames)
+        self.assertEqual(tickers, [t for t in frames if t != "EMPTY"])
+        self.assertTrue(index.is_monotonic_increasing and index.is_unique)
+        for j, t in enumerate(tickers):
+            for field in a.PRICE_FIELDS:
+                col = pd.Series(arrays[field][:, j], index=index).dropna()
+                pd.testing.assert_series_equal(col, frames[t][field], check_names=False, check_freq=False)
+
+    def test_price_summary_matches_per_frame(self):
+        frames = make_frames()
+        tickers, index, arrays = a.align_ticker_frames(frames)
+        starts, highs, ends = a.calculate_price_summary_batch(arrays["Open"], arrays["High"], arrays["Close"])
+        expected = [(df["Open"].iloc[0], df["High"].max(), df["Close"].iloc[-1]) for df in frames.values()]
+        np.testing.assert_allclose(np.column_stack([starts, highs, ends]), expected)
+
+
+class PrevCloseBatchTest(unittest.TestCase):
+    def test_latest_close_before_last_day(self):
+        frames = make_frames()
+        # Windows ending on different days; T0's ends on its first day, so it has no previous close
+        windows = {t: df.iloc[:3 if t == "T0" else 40 + 45 * i] for i, (t, df) in enumerate(frames.items())}
+        prev = a.calculate_prev_close_batch({t: (frames[t], w) for t, w in windows.items()})
+        expected = {}
+        for t, w in windows.items():
+            earlier = frames[t]["Close"][frames[t].index < w.index[-1].normalize()]
+            if not earlier.empty: expected[t] = earlier.iloc[-1]
+        self.assertNotIn("T0", expected)
+        self.assertEqual(prev.keys(), expected.keys())
+        np.testing.assert_allclose(list(prev.values()), list(expected.values()))
+
+
+class ScenariosBatchTest(unittest.TestCase):
+    def test_matches_scalar_buckets(self):
+        # Bucket edges included: |return| of exactly 3% and scores of exactly +-1
+        pairs = list(itertools.product([-10.0, -3.01, -3.0, 0.0, 3.0, 3.01, 10.0], [-2, -1, 0, 1, 2]))
+        batch = a.generate_three_scenarios_batch(*zip(*pairs))
+        for (ret, score), (grade, scenarios) in zip(pairs, batch):
+            want_grade, want_scenarios = a.generate_three_scenarios(ret, score, 0.0)
+            self.assertEqual(grade, want_grade, (ret, score))
+            self.assertIs(scenarios, want_scenarios, (ret, score))
+
+
+if __name__ == "__main__":
+    unittest.main()
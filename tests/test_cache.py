@@ -0,0 +1,158 @@
+"""Download cache: freshness, live/complete cutoff and prefix extension."""
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import analyze_sectors as a
+
+NY = a.NY
+JST = a.JST
+REPO = Path(__file__).resolve().parent.parent
+
+
+def fake_prices(tickers, start, end):
+    """Daily (ticker, field) frame for business days in [start, end); a bar's values depend only on its date."""
+    idx = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1))
+    cols = pd.MultiIndex.from_product([tickers, a.PRICE_FIELDS], names=["Ticker", "Price"])
+    days = (idx - pd.Timestamp("2024-01-01")).days.to_numpy(float)
+    values = np.add.outer(days * 10, np.arange(len(cols))) + 100
+    return pd.DataFrame(values, index=idx, columns=cols)
+
+
+class LastCloseTest(unittest.TestCase):
+    def test_last_close_in_ny_time(self):
+        # 03:12 JST Friday is 14:12 EDT Thursday: Thursday is still trading
+        now = datetime(2026, 10, 16, 3, 12, tzinfo=JST)
+        self.assertEqual(a._last_us_close(now), datetime(2026, 10, 14, 16, 0, tzinfo=NY))
+
+    def test_weekend_rolls_back_to_friday(self):
+        now = datetime(2026, 10, 18, 12, 0, tzinfo=NY)
+        self.assertEqual(a._last_us_close(now), datetime(2026, 10, 16, 16, 0, tzinfo=NY))
+
+    def test_range_complete_cutoff(self):
+        now = datetime(2026, 10, 16, 3, 12, tzinfo=JST)
+        self.assertTrue(a._range_complete("2026-10-14", now))
+        self.assertFalse(a._range_complete("2026-10-15", now))
+        self.assertFalse(a._range_complete("2026-10-16", now))
+
+
+class CacheFreshTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "entry.parquet"
+        self.path.write_bytes(b"")
+
+    def fresh(self, now, written):
+        os.utime(self.path, (written.timestamp(), written.timestamp()))
+        return a._cache_fresh(self.path, now)
+
+    def test_missing_file(self):
+        self.assertFalse(a._cache_fresh(self.path.with_name("missing"), datetime(2026, 10, 15, 12, tzinfo=NY)))
+
+    def test_session_uses_ttl(self):
+        now = datetime(2026, 10, 15, 14, 0, tzinfo=NY)
+        self.assertTrue(self.fresh(now, now - timedelta(minutes=5)))
+        self.assertFalse(self.fresh(now, now - timedelta(hours=2)))
+
+    def test_closed_market_reuses_post_close_snapshot(self):
+        premarket = datetime(2026, 10, 16, 8, 0, tzinfo=NY)
+        self.assertTrue(self.fresh(premarket, datetime(2026, 10, 15, 17, 0, tzinfo=NY)))
+        self.assertFalse(self.fresh(premarket, datetime(2026, 10, 15, 15, 0, tzinfo=NY)))
+
+    def test_weekend_snapshot_expires_at_monday_open(self):
+        friday_evening = datetime(2026, 10, 16, 18, 0, tzinfo=NY)
+        self.assertTrue(self.fresh(datetime(2026, 10, 18, 12, 0, tzinfo=NY), friday_evening))
+        self.assertFalse(self.fresh(datetime(2026, 10, 19, 10, 0, tzinfo=NY), friday_evening))
+
+    def test_invalid_ttl_falls_back(self):
+        env = dict(os.environ, MARKET_ANALYZER_CACHE_TTL="abc")
+        out = subprocess.run([sys.executable, "-c", "import analyze_sectors as a; print(a.LIVE_CACHE_TTL.total_seconds())"],
+                             cwd=REPO, env=env, capture_output=True, text=True, check=True).stdout
+        self.assertEqual(out.splitlines()[-1], "900.0")
+
+
+class DownloadWithCacheTest(unittest.TestCase):
+    tickers = ("AAA", "BBB")
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.calls = []
+        # Tickers the next download returns as all-NaN (failed / rate-limited)
+        self.failed = set()
+        # Adjustment factor applied to every bar (a split/dividend re-adjusts history)
+        self.adjust = 1.0
+        def download(tickers, start, end, **kwargs):
+            self.calls.append((start, end))
+            data = fake_prices(list(tickers), start, end) * self.adjust
+            for t in self.failed:
+                data[t] = np.nan
+            self.failed = set()
+            return data
+        for patch in (mock.patch.object(a, "CACHE_DIR", Path(tmp.name)),
+                      mock.patch.object(a, "_download_chunked", download)):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def fetch(self, start, end):
+        return a._download_with_cache(self.tickers, start, end, "1d")
+
+    def test_complete_range_is_cached(self):
+        first = self.fetch("2024-01-02", "2024-01-10")
+        again = self.fetch("2024-01-02", "2024-01-10")
+        self.assertEqual(self.calls, [("2024-01-02", "2024-01-10")])
+        pd.testing.assert_frame_equal(first, again, check_freq=False)
+
+    def cached_files(self):
+        return sorted(p.name for p in a.CACHE_DIR.rglob("*.parquet"))
+
+    def test_prefix_is_extended_with_the_missing_tail(self):
+        self.fetch("2024-01-02", "2024-01-10")
+        data = self.fetch("2024-01-02", "2024-01-17")
+        # The tail starts at the cached last bar (Tue 9th) so the overlap is compared
+        self.assertEqual(self.calls, [("2024-01-02", "2024-01-10"), ("2024-01-09", "2024-01-17")])
+        self.assertTrue(data.index.is_monotonic_increasing and data.index.is_unique)
+        self.assertEqual(list(data.index), list(pd.bdate_range("2024-01-02", "2024-01-16")))
+        pd.testing.assert_frame_equal(data, fake_prices(list(self.tickers), "2024-01-02", "2024-01-17"), check_freq=False)
+        # The extended range is itself cached and replaces its prefix
+        self.assertEqual(self.cached_files(), ["2024-01-02_2024-01-17.parquet"])
+        self.fetch("2024-01-02", "2024-01-17")
+        self.assertEqual(len(self.calls), 2)
+
+    def test_readjusted_prefix_is_downloaded_again(self):
+        self.fetch("2024-01-02", "2024-01-10")
+        self.adjust = 0.98
+        data = self.fetch("2024-01-02", "2024-01-17")
+        self.assertEqual(self.calls[-1], ("2024-01-02", "2024-01-17"))
+        pd.testing.assert_frame_equal(data, fake_prices(list(self.tickers), "2024-01-02", "2024-01-17") * 0.98, check_freq=False)
+        self.assertEqual(self.cached_files(), ["2024-01-02_2024-01-17.parquet"])
+
+    def test_failed_ticker_is_not_cached(self):
+        self.failed = {"BBB"}
+        self.fetch("2024-01-02", "2024-01-10")
+        self.assertEqual(self.cached_files(), [])
+        data = self.fetch("2024-01-02", "2024-01-10")
+        self.assertEqual(len(self.calls), 2)
+        self.assertFalse(data["BBB"].isna().any().any())
+        self.fetch("2024-01-02", "2024-01-10")
+        self.assertEqual(len(self.calls), 2)
+
+    def test_live_range_is_never_a_prefix(self):
+        live_end = (datetime.now(NY) + timedelta(days=3)).strftime("%Y-%m-%d")
+        self.fetch("2024-01-02", live_end)
+        self.assertEqual(self.cached_files(), [f"live-2024-01-02_{live_end}.parquet"])
+        self.fetch("2024-01-02", "2024-01-10")
+        self.assertEqual(self.calls[-1], ("2024-01-02", "2024-01-10"))
+
+
+if __name__ == "__main__":
+    unittest.main()
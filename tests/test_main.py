@@ -0,0 +1,75 @@
+"""main(): default runs reuse the rolling-period snapshot; --sectors limits the report."""
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import analyze_sectors as a
+
+
+def fake_period(tickers, period, interval, **kwargs):
+    """15m (ticker, field) bars for the NY sessions of the last month."""
+    days = pd.bdate_range(end=datetime.now(a.NY).date(), periods=22)
+    idx = pd.DatetimeIndex([d + pd.Timedelta(minutes=570 + 15 * i) for d in days for i in range(26)]).tz_localize(a.NY)
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.003, (len(idx), len(tickers))), axis=0))
+    fields = {"Open": close * 0.999, "High": close * 1.002, "Low": close * 0.997, "Close": close}
+    data = pd.concat({f: pd.DataFrame(v, index=idx, columns=list(tickers)) for f, v in fields.items()}, axis=1)
+    return data.swaplevel(axis=1).sort_index(axis=1)
+
+
+class DefaultRunTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        cwd = os.getcwd()
+        os.chdir(self.tmp)
+        self.addCleanup(os.chdir, cwd)
+        self.calls = []
+        def download(tickers, **kwargs):
+            self.calls.append(kwargs)
+            return fake_period(tickers, **kwargs)
+        for patch in (mock.patch.object(a, "CACHE_DIR", self.tmp / "cache"),
+                      mock.patch.object(a, "_download_chunked", download),
+                      mock.patch.object(sys, "argv", ["analyze_sectors.py", "--sectors", "XLK,GDX"]),
+                      mock.patch("sys.stdout", new=open(os.devnull, "w"))):
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(sys.stdout.close)
+
+    def test_snapshot_reused_until_next_close(self):
+        a.main()
+        self.assertEqual([c["period"] for c in self.calls], [a.ROLLING_PERIOD])
+        report = (self.tmp / "analysis_output.txt").read_text(encoding="utf-8")
+        self.assertIn("(XLK)", report)
+
+        # Second run: served from period-1mo.parquet
+        a.main()
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual((self.tmp / "analysis_output.txt").read_text(encoding="utf-8"), report)
+
+        # A snapshot from before the last close is stale whether or not the market is open
+        snapshot, = (self.tmp / "cache").rglob(f"period-{a.ROLLING_PERIOD}.parquet")
+        stale = (a._last_us_close(datetime.now(a.NY)) - timedelta(hours=1)).timestamp()
+        os.utime(snapshot, (stale, stale))
+        a.main()
+        self.assertEqual(len(self.calls), 2)
+
+    def test_theme_only_run_has_no_standard_sections(self):
+        with mock.patch.object(sys, "argv", ["analyze_sectors.py", "--sectors", "gdx"]):
+            a.main()
+        report = (self.tmp / "analysis_output.txt").read_text(encoding="utf-8")
+        self.assertIn("(GDX)", report)
+        self.assertNotIn("Standard 11", report)
+        self.assertIn("テーマ別 RF ランキング", report)
+
+
+if __name__ == "__main__":
+    unittest.main()